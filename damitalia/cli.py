@@ -1,17 +1,105 @@
 """Console script for damitalia."""
 import argparse
 import sys
+from . import differential, notation, parallel, server, tournament
+from .damitalia import Game, sequence2str
 
 
-def main():
+def movegen(positions, seed):
+    mismatches = differential.compare(positions, seed=seed)
+    for mismatch in mismatches:
+        print(mismatch)
+    print(f'{positions} positions, {len(mismatches)} mismatches')
+    for name, (elapsed, speed) in differential.benchmark(positions, seed=seed).items():
+        print(f'{name}: {elapsed:.3f}s, {speed:.0f} positions/s')
+    return 1 if mismatches else 0
+
+
+def search(fen, depth, worker_counts):
+    game = Game() if fen is None else notation.fen2game(fen)
+    base_speed = None
+    for workers, result in parallel.scaling(game, depth, worker_counts):
+        sequence = result['sequence']
+        speed = result['nodes_per_second']
+        base_speed = speed if base_speed is None else base_speed
+        print(f"{workers} workers: {sequence2str(sequence, game.is_capture(sequence))} "
+                f"score {result['score']:+.3f} depth {result['depth']} "
+                f"time to depth {result['time_to_depth']:.3f}s "
+                f"nodes {result['nodes']} {speed:.0f} nodes/s "
+                f"(x{speed / base_speed if base_speed else 0.:.2f})")
+    return 0
+
+
+def main(argv=None):
     """Console script for damitalia."""
-    parser = argparse.ArgumentParser()
-    parser.add_argument('_', nargs='*')
-    args = parser.parse_args()
+    parser = argparse.ArgumentParser(prog='damitalia')
+    subparsers = parser.add_subparsers(dest='command')
+
+    match_parser = subparsers.add_parser('match',
+            help='play paired games between two engine configs')
+    match_parser.add_argument('--engine1', default='depth=2',
+            help="candidate engine config, e.g. 'depth=3'")
+    match_parser.add_argument('--engine2', default='depth=1',
+            help="baseline engine config, e.g. 'depth=2'")
+    match_parser.add_argument('--pairs', type=int, default=100,
+            help='number of openings, each played with both colors')
+    match_parser.add_argument('--opening-plies', type=int, default=4)
+    match_parser.add_argument('--workers', type=int, default=None)
+    match_parser.add_argument('--seed', type=int, default=0)
+    match_parser.add_argument('--output', default=None,
+            help='file where game records are streamed as json lines')
+    match_parser.add_argument('--sprt', type=float, nargs=2, default=None,
+            metavar=('ELO0', 'ELO1'), help='stop early with an SPRT of elo0 vs elo1')
+    match_parser.add_argument('--alpha', type=float, default=0.05)
+    match_parser.add_argument('--beta', type=float, default=0.05)
+
+    movegen_parser = subparsers.add_parser('movegen',
+            help='compare and benchmark the move generators on random positions')
+    movegen_parser.add_argument('--positions', type=int, default=10000)
+    movegen_parser.add_argument('--seed', type=int, default=0)
+
+    search_parser = subparsers.add_parser('search',
+            help='parallel search of a position, nodes/s by number of workers')
+    search_parser.add_argument('--fen', default=None,
+            help="position to search, e.g. 'W:W0,K9:B20,K31' (default: start)")
+    search_parser.add_argument('--depth', type=int, default=6)
+    search_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+
+    subparsers.add_parser('serve', add_help=False,
+            help='run the match server (see damitalia serve --help)')
+
+    args, remaining = parser.parse_known_args(argv)
+    if args.command == 'serve':
+        return server.main(remaining)
+    if remaining:
+        parser.error(f"unrecognized arguments: {' '.join(remaining)}")
+    if args.command == 'movegen':
+        return movegen(args.positions, args.seed)
+    if args.command == 'search':
+        try:
+            return search(args.fen, args.depth, args.workers)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.command != 'match':
+        parser.print_help()
+        return 1
 
-    print("Arguments: " + str(args._))
-    print("Replace this message by putting your code into "
-          "damitalia.cli.main")
+    try:
+        engine1 = tournament.parse_engine_config(args.engine1)
+        engine2 = tournament.parse_engine_config(args.engine2)
+    except ValueError as e:
+        parser.error(str(e))
+    output = open(args.output, 'w') if args.output else None
+    try:
+        stats, decision = tournament.run_match(engine1=engine1, engine2=engine2,
+                pairs=args.pairs, output=output, workers=args.workers,
+                opening_plies=args.opening_plies, seed=args.seed,
+                sprt=args.sprt, alpha=args.alpha, beta=args.beta)
+    finally:
+        if output is not None:
+            output.close()
+    print(tournament.format_report(stats, decision, sprt=args.sprt,
+        alpha=args.alpha, beta=args.beta))
     return 0
 
 
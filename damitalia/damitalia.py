@@ -1,7 +1,7 @@
 """Main module."""
 import numpy as np
 from typing import Dict, List, Tuple, Union
-from .params import BOARD_BREADTH
+from .params import BOARD_BREADTH, NO_PROGRESS_LIMIT, REPETITION_LIMIT
 import itertools
 import logging
 import logging.config
@@ -15,7 +15,33 @@ logging.config.fileConfig(log_file_path)
 logger = logging.getLogger('damitalia')
 
 
+EMPTY = 0
+WHITE_PAWN = 1
+WHITE_QUEEN = 2
+BLACK_PAWN = 3
+BLACK_QUEEN = 4
+
+COLOR_CODES = {'white': 0, 'black': 1}
+COLOR_NAMES = ['white', 'black']
+VALUE_NAMES = ['pawn', 'queen']
+
+
+def piece_code(value: str, color: str) -> int:
+    return 1 + 2 * COLOR_CODES[color] + VALUE_NAMES.index(value)
+
+
+def piece_color(code: int) -> int:
+    """ Color code (see `COLOR_CODES`) of a non empty piece code """
+    return (code - 1) >> 1
+
+
+def is_queen(code: int) -> bool:
+    return code != EMPTY and code % 2 == 0
+
+
 class Stone:
+    """ View of a piece code, kept for compatibility with the dict based
+    board settings """
     def __init__(self, stone_id: int, value: str, color: str):
         if value not in ['pawn', 'queen']:
             logger.error("value for a stone must be 'pawn' or 'queen'. Stone\
@@ -26,28 +52,30 @@ class Stone:
                     creation cancelled.")
             return
         self.stone_id = stone_id
-        self.value = value
-        self.color = color
+        self.code = piece_code(value, color)
+
+    def get_code(self) -> int:
+        return self.code
 
     def get_color(self) -> str:
-        return self.color
+        return COLOR_NAMES[piece_color(self.code)]
 
     def get_value(self) -> str:
-        return self.value
+        return VALUE_NAMES[is_queen(self.code)]
 
     def set_value(self, value) -> None:
         if value not in ['pawn', 'queen']:
             logger.error("value for a stone must be 'pawn' or 'queen'. Stone\
                     creation cancelled.")
             return
-        if value == 'pawn' and self.value == 'queen':
+        if value == 'pawn' and is_queen(self.code):
             logger.error("Stone %i: Impossible to change value from 'queen' to\
                     'stone'", self.stone_id)
             return
-        self.value = value
+        self.code = piece_code(value, self.get_color())
 
     def __str__(self):
-        return f'<Stone {self.stone_id}: {self.color} {self.value}>'
+        return f'<Stone {self.stone_id}: {self.get_color()} {self.get_value()}>'
 
     def __repr__(self):
         return self.__str__()
@@ -83,7 +111,7 @@ class Move:
         self.landing_square = self.start_square + self.direction
         if (self.landing_square.max() >= BOARD_BREADTH or
                 self.landing_square.min() < 0):
-            logger.warning('move landing out of board')
+            logger.debug('move landing out of board')
             self.isvalid = False
 
     def is_valid(self) -> bool:
@@ -111,46 +139,196 @@ class Move:
 
 
 class Game:
-    def __init__(self, initial_setting: Union[Dict[int, Union[Stone, None]], None] = None):
+    def __init__(self, initial_setting: Union[Dict[int, Union[Stone, None]],
+            np.ndarray, None] = None, color: str = 'white'):
+        """ `initial_setting` is either a dict square index -> Stone or None,
+        or an array of piece codes. The setting is kept as a flat int8 array
+        of piece codes, Stones are only built on demand by `get_setting()` """
+        self.color = color
         if isinstance(initial_setting, dict):
             if not check_setting(initial_setting):
                 return
-            self.setting = initial_setting
+            self.squares = board_setting2squares(initial_setting)
+        elif initial_setting is not None:
+            self.squares = np.array(initial_setting, dtype=np.int8)
         else:
-            stone_id = 0
-            self.setting = {}
-            for i in range(get_max_square_index()):
+            self.squares = np.zeros(get_max_square_index() + 1, dtype=np.int8)
+            for i in range(get_max_square_index() + 1):
                 couple = coord_int2couple(i)
                 if 0 <= couple[1] < 3:
-                    stone = Stone(stone_id, 'white', 'pawn')
-                    self.setting[i] = stone
-                    stone_id += 1
+                    self.squares[i] = WHITE_PAWN
                 elif BOARD_BREADTH - 3 <= couple[1] < BOARD_BREADTH:
-                    stone = Stone(stone_id, 'black', 'pawn')
-                    self.setting[i] = stone
-                    stone_id += 1
-                else:
-                    self.setting[i] = None
-
-        def get_setting(self):
-            return self.setting
-
-        def set_setting(self, setting: Dict[int, Union[Stone, None]], check:
-                bool = False) -> None:
-            if check and not check_setting(setting):
-                return
-            self.setting = setting
+                    self.squares[i] = BLACK_PAWN
+        self.reset_history()
+
+    def reset_history(self) -> None:
+        """ Start the move history from the current position. `history` holds
+        for each ply the sequence played and what is needed to undo it,
+        `hashes` the position hash after each ply and `hash_counts` how many
+        times each position has been reached """
+        self.history = []
+        self.hashes = [self.position_hash()]
+        self.hash_counts = {self.hashes[0]: 1}
+        self.no_progress = 0
+
+    def position_hash(self) -> int:
+        """ Zobrist hash of the position, the same in every process. Computed
+        from all the squares: after a ply `hashes[-1]` gives it at no cost """
+        position_hash = int(np.bitwise_xor.reduce(
+            ZOBRIST_KEYS[SQUARE_INDICES, self.squares]))
+        return position_hash ^ ZOBRIST_BLACK if self.color == 'black' else position_hash
+
+    def get_setting(self) -> Dict[int, Union[Stone, None]]:
+        return squares2board_setting(self.squares)
+
+    def set_setting(self, setting: Dict[int, Union[Stone, None]], check:
+            bool = False) -> None:
+        if check and not check_setting(setting):
+            return
+        self.squares = board_setting2squares(setting)
+        self.reset_history()
+
+    def get_squares(self) -> np.ndarray:
+        """ Piece codes of the squares """
+        return self.squares
+
+    def get_color(self) -> str:
+        """ Color of the side to move """
+        return self.color
+
+    def copy(self) -> 'Game':
+        game = Game.__new__(Game)
+        game.squares = self.squares.copy()
+        game.color = self.color
+        game.history = list(self.history)
+        game.hashes = list(self.hashes)
+        game.hash_counts = dict(self.hash_counts)
+        game.no_progress = self.no_progress
+        return game
+
+    def legal_moves(self) -> List[List[Move]]:
+        """ Legal move sequences for the side to move. A simple move is a
+        sequence of length 1, a capture is a sequence of chained captures,
+        following the rules of `board_captures_moves`,
+        `get_capture_sequence` and `filter_capture_sequences` """
+        sequences = squares_legal_sequences(self.squares.tolist(),
+                COLOR_CODES[self.color])
+        return [[MOVES[step] for step in sequence] for sequence in sequences]
+
+    def play(self, sequence: List[Move]) -> None:
+        """ Apply a move sequence (as returned by `legal_moves()`) and give
+        the turn to the other color """
+        squares = self.squares
+        is_capture = self.is_capture(sequence)
+        self.history.append((sequence, squares.copy(), self.no_progress))
+        is_pawn_move = len(sequence) > 0 and not is_queen(
+                squares[sequence[0].get_start_square_index()])
+        self.no_progress = 0 if is_capture or is_pawn_move else self.no_progress + 1
+        # the hash is updated with the keys of the changed squares only
+        position_hash = self.hashes[-1] ^ ZOBRIST_BLACK
+        for move in sequence:
+            start = move.get_start_square_index()
+            code = squares[start]
+            squares[start] = EMPTY
+            position_hash ^= ZOBRIST_TABLE[start][code]
+            if is_capture:
+                captured = move.get_landing_square_index()
+                position_hash ^= ZOBRIST_TABLE[captured][squares[captured]]
+                squares[captured] = EMPTY
+                final_square = move.get_double_landing()
+            else:
+                final_square = move.get_landing_square_index()
+            if code == WHITE_PAWN and final_square // HALF_BREADTH == BOARD_BREADTH - 1:
+                code = WHITE_QUEEN
+            elif code == BLACK_PAWN and final_square // HALF_BREADTH == 0:
+                code = BLACK_QUEEN
+            squares[final_square] = code
+            position_hash ^= ZOBRIST_TABLE[final_square][code]
+        self.color = 'black' if self.color == 'white' else 'white'
+        self.hashes.append(position_hash)
+        self.hash_counts[position_hash] = self.hash_counts.get(position_hash, 0) + 1
+
+    def undo(self) -> List[Move]:
+        """ Take back the last sequence played and return it """
+        sequence, squares, no_progress = self.history.pop()
+        position_hash = self.hashes.pop()
+        self.hash_counts[position_hash] -= 1
+        if self.hash_counts[position_hash] == 0:
+            del self.hash_counts[position_hash]
+        self.squares[:] = squares
+        self.no_progress = no_progress
+        self.color = 'black' if self.color == 'white' else 'white'
+        return sequence
+
+    def get_history(self) -> List[List[Move]]:
+        """ Sequences played since the start (or the last `set_setting()`) """
+        return [sequence for sequence, _, _ in self.history]
+
+    def is_repetition(self) -> bool:
+        """ The current position has been reached `REPETITION_LIMIT` times """
+        return self.hash_counts[self.hashes[-1]] >= REPETITION_LIMIT
+
+    def is_draw(self) -> bool:
+        """ Draw by repetition, or after `NO_PROGRESS_LIMIT` plies without
+        capture nor pawn move """
+        return self.is_repetition() or self.no_progress >= NO_PROGRESS_LIMIT
+
+    def is_capture(self, sequence: List[Move]) -> bool:
+        """ Same as `is_capture_sequence` on the setting of the game """
+        return (len(sequence) > 0 and
+                self.squares[sequence[0].get_landing_square_index()] != EMPTY)
+
+    def has_legal_moves(self) -> bool:
+        return len(squares_legal_sequences(self.squares.tolist(),
+            COLOR_CODES[self.color])) > 0
+
+    def is_over(self) -> bool:
+        return self.is_draw() or not self.has_legal_moves()
+
+    def winner(self) -> Union[str, None]:
+        """ Color of the winner if the game is won, None otherwise. The side
+        to move loses when it has no legal move left """
+        if self.is_draw() or self.has_legal_moves():
+            return None
+        return 'black' if self.color == 'white' else 'white'
+
+    def result(self) -> Union[str, None]:
+        """ 'white' or 'black' for the winner, 'draw', or None while the game
+        goes on """
+        if self.is_draw():
+            return 'draw'
+        return self.winner()
+
+
+def board_setting2squares(board_setting: Dict[int, Union[Stone, None]]) -> np.ndarray:
+    squares = np.zeros(get_max_square_index() + 1, dtype=np.int8)
+    for i, stone in board_setting.items():
+        if stone is not None:
+            squares[i] = stone.get_code()
+    return squares
+
+
+def squares2board_setting(squares: np.ndarray) -> Dict[int, Union[Stone, None]]:
+    board_setting, stone_id = {}, 0
+    for i, code in enumerate(squares.tolist()):
+        if code == EMPTY:
+            board_setting[i] = None
+            continue
+        board_setting[i] = Stone(stone_id, VALUE_NAMES[is_queen(code)],
+                COLOR_NAMES[piece_color(code)])
+        stone_id += 1
+    return board_setting
 
 
 def check_setting(setting: Dict[int, Union[Stone, None]]):
     is_valid = True
     if (sorted(list(setting.keys())) !=
-            list(range(get_max_square_index()))):
+            list(range(get_max_square_index() + 1))):
         logger.error("""keys for this dict don't fit index range given
                 by BOARD_RANGE defined in params.py""")
         is_valid = False
     for v in setting.values():
-        if v is not None or not isinstance(v, Stone):
+        if v is not None and not isinstance(v, Stone):
             logger.error('initial_setting must contain only None or Stone')
             is_valid = False
             break
@@ -183,6 +361,30 @@ def coord_couple2int(coord: list) -> int:
     return index
 
 
+HALF_BREADTH = BOARD_BREADTH // 2
+# Directions in the order of `get_move_directions`, and directions allowed
+# for each piece code
+DIRECTIONS = [(-1, 1), (1, 1), (1, -1), (-1, -1)]
+PIECE_DIRECTIONS = [[], [0, 1], [0, 1, 2, 3], [2, 3], [0, 1, 2, 3]]
+
+
+def get_neighbours(distance: int) -> List[List[int]]:
+    """ For each square and direction of `DIRECTIONS`, index of the square at
+    `distance` diagonal steps, -1 if out of the board """
+    neighbours = []
+    for i in range(get_max_square_index() + 1):
+        x, y = coord_int2couple(i)
+        row = []
+        for dx, dy in DIRECTIONS:
+            x_next, y_next = x + distance * dx, y + distance * dy
+            if 0 <= x_next < BOARD_BREADTH and 0 <= y_next < BOARD_BREADTH:
+                row.append(coord_couple2int([x_next, y_next]))
+            else:
+                row.append(-1)
+        neighbours.append(row)
+    return neighbours
+
+
 def get_action_space() -> List[Move]:
     action_space = []
     possible_moves = [(1, 1), (1, -1), (-1, -1), (-1, 1)]
@@ -288,8 +490,8 @@ def board_captures_moves(board_setting: Dict[int, Union[None, Stone]], color: st
 
 def get_board_setting_after(board_setting: Dict[int, Union[None, Stone]], move:
         Move, is_capture: bool = False):
-    stone = board_setting.get(move.get_start_square_index())
     board_setting_after = deepcopy(board_setting)
+    stone = board_setting_after.get(move.get_start_square_index())
     board_setting_after[move.get_start_square_index()] = None
     final_square = move.get_double_landing() if is_capture \
             else move.get_landing_square_index()
@@ -355,13 +557,13 @@ def filter_capture_sequences(capture_sequences: List[Dict], board_setting:
             if len_diff > 0:
                 filtered_sequence = [capture_sequence]
             continue
-        value_c = capture_sequence.get('value'),
+        value_c = capture_sequence.get('value')
         if value_c != filtered_sequence[0].get('value'):
             if value_c == 'queen':
                 filtered_sequence = [capture_sequence]
             continue
         qcc = queen_capture(capture_sequence['sequence'], board_setting)
-        qcf = queen_capture(filtered_sequence[0], board_setting)
+        qcf = queen_capture(filtered_sequence[0]['sequence'], board_setting)
         if qcc['first'] != qcf['first']:
             if qcc['first'] > qcf['first']:
                 filtered_sequence = [capture_sequence]
@@ -372,3 +574,165 @@ def filter_capture_sequences(capture_sequences: List[Dict], board_setting:
             continue
         filtered_sequence.append(capture_sequence)
     return filtered_sequence
+
+
+def board_legal_sequences(board_setting: Dict[int, Union[None, Stone]],
+        color: str) -> List[List[Move]]:
+    """ Legal move sequences on a dict board setting, combining
+    `board_captures_moves`, `get_capture_sequence` and
+    `filter_capture_sequences`. Reference for `squares_legal_sequences` """
+    captures, moves = board_captures_moves(board_setting, color)
+    if len(captures) == 0:
+        return [[move] for move in moves]
+    capture_sequences = []
+    for capture in captures:
+        stone_value = board_setting[capture.get_start_square_index()].get_value()
+        next_board_setting = get_board_setting_after(board_setting=board_setting,
+                move=capture, is_capture=True)
+        sequences = get_capture_sequence(board_setting=next_board_setting,
+                capture_sequence=[[capture]],
+                square_index=capture.get_double_landing(), color=color,
+                stone_value=stone_value)
+        capture_sequences += [{'value': stone_value, 'sequence': sequence}
+                for sequence in sequences]
+    filtered = filter_capture_sequences(capture_sequences=capture_sequences,
+            board_setting=board_setting)
+    return [capture_sequence['sequence'] for capture_sequence in filtered]
+
+
+def is_capture_sequence(sequence: List[Move], board_setting: Dict[int,
+        Union[None, Stone]]) -> bool:
+    """ A sequence is a capture if its first move lands on an occupied
+    square """
+    if len(sequence) == 0:
+        return False
+    return board_setting.get(sequence[0].get_landing_square_index()) is not None
+
+
+def sequence2str(sequence: List[Move], is_capture: bool) -> str:
+    """ Notation of a move sequence by square indices: '9-13' for a simple
+    move, '1x10x19' for a chain of captures """
+    if len(sequence) == 0:
+        return ''
+    if not is_capture:
+        move = sequence[0]
+        return f'{move.get_start_square_index()}-{move.get_landing_square_index()}'
+    squares = [sequence[0].get_start_square_index()] + [move.get_double_landing()
+            for move in sequence]
+    return 'x'.join(str(square) for square in squares)
+
+
+NEIGHBOURS = get_neighbours(1)
+JUMPS = get_neighbours(2)
+# Move objects for each (square, direction) step, built once
+MOVES = {(i, d): Move(i, DIRECTIONS[d]) for i in range(get_max_square_index() + 1)
+        for d in range(len(DIRECTIONS)) if NEIGHBOURS[i][d] != -1}
+
+
+def squares_captures(squares: List[int], square_index: int, color_code: int) -> List[Tuple[int, int]]:
+    """ Captures (square, direction index) of the stone at `square_index`,
+    same rules as `stone_captures_moves` """
+    code = squares[square_index]
+    if code == EMPTY or piece_color(code) != color_code:
+        return []
+    captures = []
+    for d in PIECE_DIRECTIONS[code]:
+        next_square = NEIGHBOURS[square_index][d]
+        if next_square == -1:
+            continue
+        next_code = squares[next_square]
+        if next_code == EMPTY or piece_color(next_code) == color_code:
+            continue
+        if not is_queen(code) and is_queen(next_code):
+            continue
+        overnext_square = JUMPS[square_index][d]
+        if overnext_square == -1 or squares[overnext_square] != EMPTY:
+            continue
+        captures.append((square_index, d))
+    return captures
+
+
+def squares_after_capture(squares: List[int], capture: Tuple[int, int]) -> List[int]:
+    """ Same as `get_board_setting_after` for a capture """
+    square_index, d = capture
+    squares_after = list(squares)
+    code = squares_after[square_index]
+    final_square = JUMPS[square_index][d]
+    squares_after[square_index] = EMPTY
+    squares_after[NEIGHBOURS[square_index][d]] = EMPTY
+    if code == WHITE_PAWN and final_square // HALF_BREADTH == BOARD_BREADTH - 1:
+        code = WHITE_QUEEN
+    elif code == BLACK_PAWN and final_square // HALF_BREADTH == 0:
+        code = BLACK_QUEEN
+    squares_after[final_square] = code
+    return squares_after
+
+
+def squares_capture_sequences(squares: List[int], sequence: List[Tuple[int, int]],
+        square_index: int, color_code: int, stone_is_queen: bool,
+        call_depth: int = 0) -> List[List[Tuple[int, int]]]:
+    """ Same as `get_capture_sequence` for a single starting sequence """
+    captures = squares_captures(squares, square_index, color_code)
+    if len(captures) == 0 or (not stone_is_queen and call_depth == 2):
+        return [sequence + captures]
+    next_sequences = []
+    for capture in captures:
+        next_sequences += squares_capture_sequences(
+                squares_after_capture(squares, capture), sequence + [capture],
+                JUMPS[capture[0]][capture[1]], color_code, stone_is_queen,
+                call_depth + 1)
+    return next_sequences
+
+
+def squares_queen_capture(squares: List[int], sequence: List[Tuple[int, int]]) -> Tuple[int, int]:
+    """ Same as `queen_capture`: index of the first captured queen (-1 if
+    none) and number of captured queens """
+    first, number = -1, 0
+    for i, (square_index, d) in enumerate(sequence):
+        if not is_queen(squares[NEIGHBOURS[square_index][d]]):
+            continue
+        first = i if first == -1 else first
+        number += 1
+    return first, number
+
+
+def squares_legal_sequences(squares: List[int], color_code: int) -> List[List[Tuple[int, int]]]:
+    """ Legal sequences of (square, direction index) steps on a list of piece
+    codes, with the rules of `board_captures_moves`, `get_capture_sequence`
+    and `filter_capture_sequences` """
+    captures = []
+    for square_index in range(len(squares)):
+        captures += squares_captures(squares, square_index, color_code)
+    if len(captures) == 0:
+        moves = []
+        for square_index, code in enumerate(squares):
+            if code == EMPTY or piece_color(code) != color_code:
+                continue
+            for d in PIECE_DIRECTIONS[code]:
+                next_square = NEIGHBOURS[square_index][d]
+                if next_square != -1 and squares[next_square] == EMPTY:
+                    moves.append([(square_index, d)])
+        return moves
+    best_rank, filtered = None, []
+    for capture in captures:
+        stone_is_queen = is_queen(squares[capture[0]])
+        for sequence in squares_capture_sequences(
+                squares_after_capture(squares, capture), [capture],
+                JUMPS[capture[0]][capture[1]], color_code, stone_is_queen):
+            rank = (len(sequence), stone_is_queen) + squares_queen_capture(squares, sequence)
+            if best_rank is None or rank > best_rank:
+                best_rank, filtered = rank, [sequence]
+            elif rank == best_rank:
+                filtered.append(sequence)
+    return filtered
+
+
+SQUARE_INDICES = np.arange(get_max_square_index() + 1)
+# Random keys of each piece code on each square, the empty code keeping the
+# hash unchanged, and of black to move
+ZOBRIST_KEYS = np.random.default_rng(20210912).integers(2 ** 63,
+        size=(get_max_square_index() + 1, BLACK_QUEEN + 1), dtype=np.uint64)
+ZOBRIST_KEYS[:, EMPTY] = 0
+ZOBRIST_BLACK = int(np.random.default_rng(20210913).integers(2 ** 63, dtype=np.uint64))
+# Same keys as python ints, for the incremental update in `Game.play()`
+ZOBRIST_TABLE = ZOBRIST_KEYS.tolist()
@@ -0,0 +1,129 @@
+"""Differential testing and benchmark of move generators.
+
+Random reachable positions are sampled from random playouts of `Game()`, and
+the legal move sets given by each move generator of `GENERATORS` are compared.
+A position where two generators disagree is shrunk (stones removed, queens
+turned into pawns) as long as they still disagree, and reported as a FEN-like
+string (see `damitalia.notation`) ready to be used as a test fixture.
+"""
+import random
+import time
+from typing import Callable, Dict, Iterator, List, Set, Tuple, Union
+from .damitalia import (BLACK_PAWN, BLACK_QUEEN, COLOR_CODES, EMPTY, Game,
+        WHITE_PAWN, WHITE_QUEEN, board_legal_sequences, is_capture_sequence,
+        sequence2str, squares_legal_sequences, MOVES)
+from .notation import game2fen
+
+
+def reference_legal_moves(game: Game) -> Set[str]:
+    """ Legal moves given by the dict based functions `board_captures_moves`,
+    `get_capture_sequence` and `filter_capture_sequences` """
+    board_setting = game.get_setting()
+    return {sequence2str(sequence, is_capture_sequence(sequence, board_setting))
+            for sequence in board_legal_sequences(board_setting, game.get_color())}
+
+
+def fast_legal_moves(game: Game) -> Set[str]:
+    """ Legal moves given by `squares_legal_sequences` on the piece codes """
+    squares = game.get_squares().tolist()
+    sequences = squares_legal_sequences(squares, COLOR_CODES[game.get_color()])
+    return {sequence2str([MOVES[step] for step in sequence],
+        squares[MOVES[sequence[0]].get_landing_square_index()] != EMPTY)
+        for sequence in sequences}
+
+
+GENERATORS = {'reference': reference_legal_moves, 'fast': fast_legal_moves}
+
+
+def random_positions(n_positions: int, seed: int = 0,
+        max_plies: int = 150) -> Iterator[Game]:
+    """ Yield `n_positions` positions reached by random playouts from
+    `Game()`, every position of each playout being kept up to the end of the
+    game, a win or a draw """
+    rng = random.Random(seed)
+    count = 0
+    while True:
+        game = Game()
+        for _ in range(max_plies):
+            if count == n_positions:
+                return
+            yield game.copy()
+            count += 1
+            if game.is_over():
+                break
+            game.play(rng.choice(game.legal_moves()))
+
+
+def get_moves(generator: Callable[[Game], Set[str]], game: Game) -> Union[Set[str], str]:
+    """ Moves given by `generator`, or the error it raised """
+    try:
+        return generator(game)
+    except Exception as e:
+        return f'{type(e).__name__}: {e}'
+
+
+def disagree(game: Game, first: Callable[[Game], Set[str]],
+        second: Callable[[Game], Set[str]]) -> bool:
+    return get_moves(first, game) != get_moves(second, game)
+
+
+def shrink(game: Game, first: Callable[[Game], Set[str]],
+        second: Callable[[Game], Set[str]]) -> Game:
+    """ Smallest position found from `game` on which `first` and `second`
+    still disagree, by removing stones and turning queens into pawns """
+    squares = game.get_squares().copy()
+    demoted = {WHITE_QUEEN: WHITE_PAWN, BLACK_QUEEN: BLACK_PAWN}
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(squares)):
+            if squares[i] == EMPTY:
+                continue
+            for code in [EMPTY, demoted.get(int(squares[i]))]:
+                if code is None:
+                    continue
+                candidate = squares.copy()
+                candidate[i] = code
+                if disagree(Game(initial_setting=candidate, color=game.get_color()),
+                        first, second):
+                    squares = candidate
+                    changed = True
+                    break
+    return Game(initial_setting=squares, color=game.get_color())
+
+
+def compare(n_positions: int, seed: int = 0, generators: Union[Dict[str,
+        Callable[[Game], Set[str]]], None] = None) -> List[Dict]:
+    """ Compare every generator to the first one on `n_positions` random
+    positions. Return the mismatches, each with the shrunk position as FEN
+    and the moves given by both generators on it """
+    generators = GENERATORS if generators is None else generators
+    names = list(generators.keys())
+    reference = generators[names[0]]
+    mismatches = []
+    for game in random_positions(n_positions, seed=seed):
+        for name in names[1:]:
+            if not disagree(game, reference, generators[name]):
+                continue
+            fixture = shrink(game, reference, generators[name])
+            mismatches.append({'generator': name, 'position': game2fen(game),
+                'fixture': game2fen(fixture),
+                names[0]: get_moves(reference, fixture),
+                name: get_moves(generators[name], fixture)})
+    return mismatches
+
+
+def benchmark(n_positions: int, seed: int = 0, generators: Union[Dict[str,
+        Callable[[Game], Set[str]]], None] = None) -> Dict[str, Tuple[float, float]]:
+    """ Time each generator on the same `n_positions` random positions. Return
+    for each generator the elapsed seconds and the positions per second """
+    generators = GENERATORS if generators is None else generators
+    games = list(random_positions(n_positions, seed=seed))
+    timings = {}
+    for name, generator in generators.items():
+        start = time.perf_counter()
+        for game in games:
+            generator(game)
+        elapsed = time.perf_counter() - start
+        timings[name] = (elapsed, len(games) / elapsed if elapsed > 0 else 0.)
+    return timings
@@ -0,0 +1,141 @@
+"""Search engine."""
+import numpy as np
+import random
+from typing import List, Tuple, Union
+from .damitalia import (BLACK_PAWN, BLACK_QUEEN, Game, Move, WHITE_PAWN,
+        WHITE_QUEEN)
+from .params import PAWN_VALUE, QUEEN_VALUE, WIN_SCORE
+
+
+def evaluate(game: Game) -> float:
+    """ Material balance from the point of view of the side to move """
+    counts = np.bincount(game.get_squares(), minlength=BLACK_QUEEN + 1)
+    score = (PAWN_VALUE * (counts[WHITE_PAWN] - counts[BLACK_PAWN]) +
+            QUEEN_VALUE * (counts[WHITE_QUEEN] - counts[BLACK_QUEEN]))
+    return float(score if game.get_color() == 'white' else -score)
+
+
+# Bound stored with a score in the transposition table
+EXACT = 1
+LOWER_BOUND = 2
+UPPER_BOUND = 3
+SCORE_SCALE = 1000
+
+
+class TranspositionTable:
+    """ Table of search results indexed by the position hash `Game.hashes[-1]`.
+    Each entry is two uint64 words, the key xor the data and the data, so that
+    a torn entry written concurrently by another process is seen as a miss: the
+    table can be shared without lock (see `damitalia.parallel`) """
+    def __init__(self, size: int = 2 ** 16, buffer=None):
+        if size & (size - 1):
+            raise ValueError('size of a transposition table must be a power of 2')
+        self.size = size
+        self.table = np.ndarray((size, 2), dtype=np.uint64, buffer=buffer)
+        if buffer is None:
+            self.table[:] = 0
+
+    def probe(self, key: int) -> Union[Tuple[int, int, float, int], None]:
+        """ Depth, bound, score and best move index stored for `key`, None if
+        there is no valid entry """
+        checked, data = self.table[key & (self.size - 1)].tolist()
+        if data == 0 or checked ^ data != key:
+            return None
+        score = ((data & 0xFFFFFFFF) - 2 ** 31) / SCORE_SCALE
+        return (data >> 32) & 0xFF, (data >> 40) & 0x3, score, (data >> 48) - 1
+
+    def store(self, key: int, depth: int, bound: int, score: float, move_index: int) -> None:
+        data = (int(round(score * SCORE_SCALE)) + 2 ** 31) | (depth << 32) | \
+                (bound << 40) | ((move_index + 1) << 48)
+        self.table[key & (self.size - 1)] = (key ^ data, data)
+
+
+class SearchStats:
+    def __init__(self):
+        self.nodes = 0
+
+
+def negamax(game: Game, depth: int, alpha: float, beta: float,
+        tt: Union[TranspositionTable, None] = None,
+        stats: Union[SearchStats, None] = None) -> float:
+    """ Fail-soft alpha-beta score of `game` for the side to move. Results are
+    looked up and stored in `tt` if given, visited nodes counted in `stats` """
+    if stats is not None:
+        stats.nodes += 1
+    if game.is_draw():
+        return 0.
+    legal_moves = game.legal_moves()
+    if len(legal_moves) == 0:
+        return -WIN_SCORE - depth
+    if depth == 0:
+        return evaluate(game)
+    order = list(range(len(legal_moves)))
+    if tt is not None:
+        key = game.hashes[-1]
+        entry = tt.probe(key)
+        if entry is not None:
+            entry_depth, bound, score, move_index = entry
+            if entry_depth >= depth:
+                if (bound == EXACT or (bound == LOWER_BOUND and score >= beta) or
+                        (bound == UPPER_BOUND and score <= alpha)):
+                    return score
+            if 0 <= move_index < len(legal_moves):
+                order.remove(move_index)
+                order.insert(0, move_index)
+    alpha_start = alpha
+    best_score, best_index = -float('inf'), order[0]
+    for i in order:
+        game.play(legal_moves[i])
+        score = -negamax(game, depth - 1, -beta, -alpha, tt, stats)
+        game.undo()
+        if score > best_score:
+            best_score, best_index = score, i
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            break
+    if tt is not None:
+        bound = (UPPER_BOUND if best_score <= alpha_start else
+                LOWER_BOUND if best_score >= beta else EXACT)
+        tt.store(key, depth, bound, best_score, best_index)
+    return best_score
+
+
+def search(game: Game, depth: int, rng: Union[random.Random, None] = None,
+        tt: Union[TranspositionTable, None] = None,
+        stats: Union[SearchStats, None] = None) -> Tuple[float, List[Move]]:
+    """ Best score and move sequence for the side to move, searching `depth`
+    plies. Equally scored sequences are broken by `rng` if given. Moves are
+    played and taken back on `game`, which is left unchanged """
+    best_score, best_sequences = -float('inf'), []
+    for sequence in game.legal_moves():
+        game.play(sequence)
+        score = -negamax(game, depth - 1, -float('inf'), float('inf'), tt, stats)
+        game.undo()
+        if score > best_score:
+            best_score, best_sequences = score, [sequence]
+        elif score == best_score:
+            best_sequences.append(sequence)
+    if len(best_sequences) == 0:
+        return -WIN_SCORE, []
+    best_sequence = best_sequences[0] if rng is None else rng.choice(best_sequences)
+    return best_score, best_sequence
+
+
+class Engine:
+    def __init__(self, depth: int = 2, seed: Union[int, None] = None):
+        self.depth = depth
+        self.rng = random.Random(seed)
+
+    def choose(self, game: Game, seed: Union[int, None] = None) -> List[Move]:
+        """ Best sequence for `game`, ties broken by the engine random state,
+        or by `seed` if given. Pass a seed when the engine is sent to another
+        process, where its random state would never advance """
+        rng = self.rng if seed is None else random.Random(seed)
+        _, sequence = search(game, depth=self.depth, rng=rng)
+        return sequence
+
+    def __str__(self):
+        return f'<Engine depth {self.depth}>'
+
+    def __repr__(self):
+        return self.__str__()
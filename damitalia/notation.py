@@ -0,0 +1,112 @@
+"""Compact serialization of game positions.
+
+A position is written as a FEN-like string giving the side to move, then the
+white and black stones by square index, queens prefixed by 'K':
+
+    W:W0,1,2,K9:B20,K21
+
+and packed in a 128-bit integer key made of two 64-bit words (low, high): 3
+bits per square (see the piece codes in `damitalia.damitalia`), the first 21 squares in the low
+word, the other ones in the high word followed by the side to move (1 for
+black). In bulk the keys are kept as uint64 arrays of shape (n, 2).
+"""
+import numpy as np
+from typing import Iterable, List, Tuple
+from .damitalia import (BLACK_PAWN, COLOR_CODES, COLOR_NAMES, EMPTY, Game,
+        WHITE_PAWN, get_max_square_index, is_queen, piece_color)
+
+PIECE_BITS = 3
+LOW_SQUARES = 64 // PIECE_BITS
+
+
+def get_shifts(n_squares: int) -> np.ndarray:
+    """ Bit offset of each square in its word """
+    indices = np.arange(n_squares, dtype=np.uint64)
+    indices[LOW_SQUARES:] -= np.uint64(LOW_SQUARES)
+    return np.uint64(PIECE_BITS) * indices
+
+
+def game2squares(game: Game) -> np.ndarray:
+    """ Piece codes of the squares of `game` as an int8 array """
+    return game.get_squares().copy()
+
+
+def squares2game(squares: np.ndarray, color: str = 'white') -> Game:
+    return Game(initial_setting=squares, color=color)
+
+
+def game2fen(game: Game) -> str:
+    squares = {'white': [], 'black': []}
+    for i, code in enumerate(game.get_squares().tolist()):
+        if code == EMPTY:
+            continue
+        prefix = 'K' if is_queen(code) else ''
+        squares[COLOR_NAMES[piece_color(code)]].append(f'{prefix}{i}')
+    return (f"{game.get_color()[0].upper()}:W{','.join(squares['white'])}"
+            f":B{','.join(squares['black'])}")
+
+
+def fen2game(fen: str) -> Game:
+    """ Inverse of `game2fen`. Raise ValueError on a malformed string """
+    fields = fen.strip().split(':')
+    if (len(fields) != 3 or fields[0] not in ['W', 'B'] or
+            not fields[1].startswith('W') or not fields[2].startswith('B')):
+        raise ValueError(f'invalid position {fen}')
+    squares = np.zeros(get_max_square_index() + 1, dtype=np.int8)
+    for field, pawn in [(fields[1], WHITE_PAWN), (fields[2], BLACK_PAWN)]:
+        for square in filter(None, field[1:].split(',')):
+            is_queen = square.startswith('K')
+            index = int(square[1:] if is_queen else square)
+            if not 0 <= index < len(squares) or squares[index] != EMPTY:
+                raise ValueError(f'invalid square {square} in position {fen}')
+            squares[index] = pawn + is_queen
+    return squares2game(squares, color='white' if fields[0] == 'W' else 'black')
+
+
+def encode_positions(squares: np.ndarray, colors: np.ndarray) -> np.ndarray:
+    """ Pack positions given by piece codes of shape (n, 32) and side to move
+    codes of shape (n,) (see `COLOR_CODES`) into keys of shape (n, 2) """
+    squares = np.asarray(squares, dtype=np.uint64).reshape((-1, get_max_square_index() + 1))
+    shifted = squares << get_shifts(squares.shape[1])
+    keys = np.empty((squares.shape[0], 2), dtype=np.uint64)
+    keys[:, 0] = np.bitwise_or.reduce(shifted[:, :LOW_SQUARES], axis=1)
+    keys[:, 1] = np.bitwise_or.reduce(shifted[:, LOW_SQUARES:], axis=1)
+    color_shift = np.uint64(PIECE_BITS * (squares.shape[1] - LOW_SQUARES))
+    keys[:, 1] |= np.asarray(colors, dtype=np.uint64) << color_shift
+    return keys
+
+
+def decode_positions(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Inverse of `encode_positions` """
+    keys = np.asarray(keys, dtype=np.uint64).reshape((-1, 2))
+    n_squares = get_max_square_index() + 1
+    words = np.concatenate([np.repeat(keys[:, :1], LOW_SQUARES, axis=1),
+        np.repeat(keys[:, 1:], n_squares - LOW_SQUARES, axis=1)], axis=1)
+    squares = ((words >> get_shifts(n_squares)) & np.uint64(2 ** PIECE_BITS - 1)).astype(np.int8)
+    color_shift = np.uint64(PIECE_BITS * (n_squares - LOW_SQUARES))
+    colors = ((keys[:, 1] >> color_shift) & np.uint64(1)).astype(np.int8)
+    return squares, colors
+
+
+def games2keys(games: Iterable[Game]) -> np.ndarray:
+    games = list(games)
+    squares = np.array([game2squares(game) for game in games], dtype=np.int8)
+    colors = np.array([COLOR_CODES[game.get_color()] for game in games], dtype=np.int8)
+    return encode_positions(squares, colors)
+
+
+def keys2games(keys: np.ndarray) -> List[Game]:
+    squares, colors = decode_positions(keys)
+    return [squares2game(s, color=COLOR_NAMES[c])
+            for s, c in zip(squares, colors)]
+
+
+def game2key(game: Game) -> int:
+    """ Position of `game` as a single 128-bit integer, usable in sets and as
+    dict keys """
+    low, high = games2keys([game])[0].tolist()
+    return (high << 64) | low
+
+
+def key2game(key: int) -> Game:
+    return keys2games(np.array([[key & (2 ** 64 - 1), key >> 64]], dtype=np.uint64))[0]
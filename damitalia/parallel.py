@@ -0,0 +1,116 @@
+"""Parallel search (Lazy SMP) over a shared transposition table.
+
+Several worker processes search the same root position with iterative
+deepening: the main worker to the target depth, the helpers alternately to the
+target depth and one ply deeper, each one with its own root move order. They
+share a single `TranspositionTable` held in `multiprocessing.shared_memory`, written
+without lock, so that what one worker finds is used by the others. The results
+are merged at the root.
+"""
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Tuple
+from .damitalia import Game
+from .engine import SearchStats, TranspositionTable, negamax
+from .params import WIN_SCORE
+
+# Shared transposition table of a worker process, set by `attach_table`
+worker_table = {}
+
+
+def attach_table(name: str, size: int) -> None:
+    """ Initializer of the worker processes """
+    memory = shared_memory.SharedMemory(name=name)
+    worker_table['memory'] = memory
+    worker_table['tt'] = TranspositionTable(size, buffer=memory.buf)
+
+
+def worker_ready() -> None:
+    """ No-op task, to start the worker processes before timing a search """
+
+
+def worker_search(game: Game, depth: int, seed: int) -> Dict:
+    """ Iterative deepening search up to `depth` on the shared table. Root
+    moves are shuffled by `seed` (kept in order for seed 0). Return the score
+    and index in `game.legal_moves()` of the best move of the last iteration,
+    the depth reached, the nodes visited and the time spent """
+    tt = worker_table['tt']
+    stats = SearchStats()
+    start = time.perf_counter()
+    legal_moves = game.legal_moves()
+    order = list(range(len(legal_moves)))
+    if seed != 0:
+        random.Random(seed).shuffle(order)
+    best_score, best_index = -WIN_SCORE, -1
+    for iteration_depth in range(1, depth + 1):
+        alpha, iteration_best = -float('inf'), order[0] if order else -1
+        for i in order:
+            game.play(legal_moves[i])
+            score = -negamax(game, iteration_depth - 1, -float('inf'), -alpha, tt, stats)
+            game.undo()
+            if score > alpha:
+                alpha, iteration_best = score, i
+        best_score, best_index = alpha, iteration_best
+        if best_index != -1:
+            order.remove(best_index)
+            order.insert(0, best_index)
+    return {'score': best_score, 'move_index': best_index, 'depth': depth,
+            'nodes': stats.nodes, 'elapsed': time.perf_counter() - start}
+
+
+def merge_results(results: List[Dict]) -> Dict:
+    """ Best move of the deepest searches, the one found by most workers and
+    then the best scored """
+    depth = max(result['depth'] for result in results)
+    deepest = [result for result in results if result['depth'] == depth]
+    votes = {}
+    for result in deepest:
+        votes[result['move_index']] = votes.get(result['move_index'], 0) + 1
+    best = max(deepest, key=lambda result: (votes[result['move_index']], result['score']))
+    return {'score': best['score'], 'move_index': best['move_index'], 'depth': depth}
+
+
+def lazy_smp(game: Game, depth: int, workers: int = 2,
+        tt_size: int = 2 ** 18) -> Dict:
+    """ Search `game` with `workers` processes sharing one transposition
+    table of `tt_size` entries, the main worker (seed 0) to `depth` and half
+    of the helpers one ply deeper for diversity. Return the merged result with
+    the best sequence, the time to depth (until the main worker reaches
+    `depth`), the total nodes, and the wall time from the first search
+    submitted to the last result with the nodes per second over it. The pool
+    is started by a no-op task beforehand, so that process start up is not
+    timed """
+    memory = shared_memory.SharedMemory(create=True, size=tt_size * 16)
+    try:
+        TranspositionTable(tt_size, buffer=memory.buf).table[:] = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=attach_table,
+                initargs=(memory.name, tt_size)) as executor:
+            for future in [executor.submit(worker_ready) for _ in range(workers)]:
+                future.result()
+            start = time.perf_counter()
+            futures = [executor.submit(worker_search, game.copy(), depth + i % 2, i)
+                    for i in range(workers)]
+            results = [futures[0].result()]
+            time_to_depth = time.perf_counter() - start
+            results += [future.result() for future in futures[1:]]
+            elapsed = time.perf_counter() - start
+    finally:
+        memory.close()
+        memory.unlink()
+    merged = merge_results(results)
+    legal_moves = game.legal_moves()
+    nodes = sum(result['nodes'] for result in results)
+    merged.update({'sequence': legal_moves[merged['move_index']] if legal_moves else [],
+        'time_to_depth': time_to_depth, 'nodes': nodes, 'elapsed': elapsed,
+        'nodes_per_second': nodes / elapsed if elapsed > 0 else 0.})
+    return merged
+
+
+def scaling(game: Game, depth: int, worker_counts: List[int],
+        tt_size: int = 2 ** 18) -> List[Tuple[int, Dict]]:
+    """ Run `lazy_smp` for each worker count, to compare the time for the
+    main worker to reach `depth` and the nodes per second """
+    return [(workers, lazy_smp(game, depth, workers=workers, tt_size=tt_size))
+            for workers in worker_counts]
@@ -1,2 +1,8 @@
 BOARD_BREADTH = 8
 
+PAWN_VALUE = 1.0
+QUEEN_VALUE = 3.0
+WIN_SCORE = 1000.0
+MAX_PLIES = 200
+REPETITION_LIMIT = 3
+NO_PROGRESS_LIMIT = 80
@@ -0,0 +1,294 @@
+"""Asyncio match server hosting concurrent game sessions.
+
+Clients talk to the server with a line based text protocol, over TCP or
+stdin/stdout. Each request is one line, each answer is one line starting with
+`OK`, `END` or `ERR`:
+
+    NEW <white|black|none>  open a session, the human plays the given color
+                            (`none`: the engine plays both sides)
+    MOVES <session_id>      legal moves for the side to move
+    PLAY <session_id> <move>
+                            play a move, answered with the engine reply
+    WAIT <session_id>       wait for the end of an engine vs engine session
+    STATS [<session_id>]    latency and throughput metrics
+    CLOSE <session_id>      close a session
+    QUIT                    close the connection
+
+Moves are written by square indices, '9-13' for a simple move, '1x10x19' for
+a chain of captures (see `damitalia.sequence2str`).
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Union
+from .damitalia import Game, Move, logger, sequence2str
+from .engine import Engine
+from .params import MAX_PLIES
+
+
+class SessionStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.plies = 0
+        self.requests = 0
+        self.total_latency = 0.
+        self.max_latency = 0.
+        self.engine_time = 0.
+
+    def record_request(self, latency: float) -> None:
+        self.requests += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def record_engine(self, elapsed: float) -> None:
+        self.engine_time += elapsed
+
+    def get_metrics(self) -> Dict[str, float]:
+        elapsed = time.monotonic() - self.started
+        mean_latency = self.total_latency / self.requests if self.requests else 0.
+        return {'plies': self.plies, 'requests': self.requests,
+                'mean_latency': mean_latency, 'max_latency': self.max_latency,
+                'engine_time': self.engine_time,
+                'plies_per_second': self.plies / elapsed if elapsed > 0 else 0.}
+
+
+class Session:
+    def __init__(self, session_id: int, human_color: Union[str, None], seed: int = 0):
+        self.session_id = session_id
+        self.human_color = human_color
+        self.seed = seed
+        self.game = Game()
+        self.stats = SessionStats()
+        self.lock = asyncio.Lock()
+        self.task = None
+
+    def legal_moves(self) -> Dict[str, List[Move]]:
+        return {sequence2str(sequence, self.game.is_capture(sequence)):
+                sequence for sequence in self.game.legal_moves()}
+
+    def play(self, sequence: List[Move]) -> str:
+        notation = sequence2str(sequence, self.game.is_capture(sequence))
+        self.game.play(sequence)
+        self.stats.plies += 1
+        return notation
+
+    def is_over(self) -> bool:
+        return self.game.is_over() or self.stats.plies >= MAX_PLIES
+
+    def result(self) -> str:
+        """ Winner color, or 'draw' (also when the ply limit is reached) """
+        result = self.game.result()
+        return 'draw' if result is None else result
+
+
+def format_metrics(metrics: Dict[str, float]) -> str:
+    return ' '.join(f'{key}={value:.6g}' if isinstance(value, float)
+            else f'{key}={value}' for key, value in metrics.items())
+
+
+# Number of arguments (min, max) of each command
+COMMAND_ARGUMENTS = {'new': (0, 1), 'moves': (1, 1), 'play': (2, 2),
+        'wait': (1, 1), 'stats': (0, 1), 'close': (1, 1)}
+
+
+class GameServer:
+    def __init__(self, engine: Union[Engine, None] = None,
+            executor: Union[Executor, None] = None, seed: Union[int, None] = None):
+        self.engine = Engine() if engine is None else engine
+        self.executor = ProcessPoolExecutor() if executor is None else executor
+        self.rng = random.Random(seed)
+        self.sessions = {}
+        self.session_ids = itertools.count()
+        self.started = time.monotonic()
+        self.total_plies = 0
+
+    async def engine_play(self, session: Session) -> str:
+        """ Let the engine choose a move in the executor pool and play it. The
+        engine is pickled anew for each call, so ties are broken by a seed
+        derived from the session and the ply """
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        sequence = await loop.run_in_executor(self.executor, self.engine.choose,
+                session.game.copy(), session.seed + session.stats.plies)
+        session.stats.record_engine(time.monotonic() - start)
+        self.total_plies += 1
+        return session.play(sequence)
+
+    async def self_play(self, session: Session) -> str:
+        while not session.is_over():
+            async with session.lock:
+                await self.engine_play(session)
+        return session.result()
+
+    def get_session(self, session_id: str) -> Session:
+        try:
+            return self.sessions[int(session_id)]
+        except (KeyError, ValueError):
+            raise ValueError(f'unknown session {session_id}')
+
+    async def cmd_new(self, human_color: str = 'white') -> str:
+        if human_color not in ['white', 'black', 'none']:
+            raise ValueError("color must be 'white', 'black' or 'none'")
+        session_id = next(self.session_ids)
+        session = Session(session_id, None if human_color == 'none' else human_color,
+                seed=self.rng.randrange(2 ** 32))
+        self.sessions[session_id] = session
+        if session.human_color is None:
+            session.task = asyncio.create_task(self.self_play(session))
+            return f'OK {session_id}'
+        if session.human_color == 'white':
+            return f'OK {session_id}'
+        async with session.lock:
+            try:
+                notation = await self.engine_play(session)
+            except BaseException:
+                del self.sessions[session_id]
+                raise
+        return f'OK {session_id} {notation}'
+
+    async def cmd_moves(self, session_id: str) -> str:
+        session = self.get_session(session_id)
+        return ' '.join(['OK'] + list(session.legal_moves().keys()))
+
+    async def cmd_play(self, session_id: str, notation: str) -> str:
+        session = self.get_session(session_id)
+        if session.human_color is None:
+            raise ValueError(f'session {session_id} is played by the engine')
+        async with session.lock:
+            if session.is_over():
+                return f'END {session.result()}'
+            if session.game.get_color() != session.human_color:
+                raise ValueError('not your turn')
+            legal_moves = session.legal_moves()
+            if notation not in legal_moves:
+                raise ValueError(f'illegal move {notation}')
+            session.play(legal_moves[notation])
+            self.total_plies += 1
+            if session.is_over():
+                return f'END {session.result()}'
+            try:
+                reply = await self.engine_play(session)
+            except BaseException:
+                # take the human move back, so that it can be played again
+                session.game.undo()
+                session.stats.plies -= 1
+                self.total_plies -= 1
+                raise
+            if session.is_over():
+                return f'END {session.result()} {reply}'
+            return f'OK {reply}'
+
+    async def cmd_wait(self, session_id: str) -> str:
+        session = self.get_session(session_id)
+        if session.task is None:
+            raise ValueError(f'session {session_id} is not played by the engine')
+        try:
+            return f'END {await session.task}'
+        except asyncio.CancelledError:
+            if not session.task.cancelled():
+                raise
+            return 'END closed'
+
+    async def cmd_stats(self, session_id: Union[str, None] = None) -> str:
+        if session_id is not None:
+            return 'OK ' + format_metrics(self.get_session(session_id).stats.get_metrics())
+        return 'OK ' + format_metrics(self.get_metrics())
+
+    async def cmd_close(self, session_id: str) -> str:
+        session = self.get_session(session_id)
+        if session.task is not None:
+            session.task.cancel()
+        del self.sessions[session.session_id]
+        return 'OK'
+
+    def get_metrics(self) -> Dict[str, float]:
+        elapsed = time.monotonic() - self.started
+        return {'sessions': len(self.sessions), 'plies': self.total_plies,
+                'plies_per_second': self.total_plies / elapsed if elapsed > 0 else 0.}
+
+    async def handle_command(self, line: str) -> str:
+        """ Answer one protocol line """
+        words = line.split()
+        if len(words) == 0:
+            return 'ERR empty command'
+        name, arguments = words[0].lower(), words[1:]
+        if name not in COMMAND_ARGUMENTS:
+            return f'ERR unknown command {words[0]}'
+        min_arguments, max_arguments = COMMAND_ARGUMENTS[name]
+        if not min_arguments <= len(arguments) <= max_arguments:
+            return f'ERR wrong number of arguments for {name.upper()}'
+        start = time.monotonic()
+        try:
+            answer = await getattr(self, f'cmd_{name}')(*arguments)
+        except ValueError as e:
+            return f'ERR {e}'
+        except Exception as e:
+            logger.exception('%s failed', line.strip())
+            return f'ERR internal error: {type(e).__name__}'
+        if len(words) > 1 and words[1].isdigit() and int(words[1]) in self.sessions:
+            self.sessions[int(words[1])].stats.record_request(time.monotonic() - start)
+        return answer
+
+    async def handle_client(self, reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line or line.strip().upper() == b'QUIT':
+                    break
+                answer = await self.handle_command(line.decode())
+                writer.write((answer + '\n').encode())
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve_tcp(self, host: str = '127.0.0.1', port: int = 8765) -> None:
+        server = await asyncio.start_server(self.handle_client, host, port)
+        logger.info('match server listening on %s:%i', host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def serve_stdio(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            if not line or line.strip().upper() == 'QUIT':
+                break
+            answer = await self.handle_command(line)
+            sys.stdout.write(answer + '\n')
+            sys.stdout.flush()
+
+
+def main(argv: Union[List[str], None] = None) -> int:
+    parser = argparse.ArgumentParser(description='damitalia match server')
+    parser.add_argument('--stdio', action='store_true',
+            help='talk over stdin/stdout instead of TCP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--depth', type=int, default=2, help='engine search depth')
+    parser.add_argument('--seed', type=int, default=None,
+            help='seed of the engine tie breaks, for reproducible sessions')
+    parser.add_argument('--workers', type=int, default=None,
+            help='size of the engine process pool')
+    args = parser.parse_args(argv)
+
+    server = GameServer(engine=Engine(depth=args.depth), seed=args.seed,
+            executor=ProcessPoolExecutor(max_workers=args.workers))
+    try:
+        if args.stdio:
+            asyncio.run(server.serve_stdio())
+        else:
+            asyncio.run(server.serve_tcp(host=args.host, port=args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.executor.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())  # pragma: no cover
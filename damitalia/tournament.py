@@ -0,0 +1,236 @@
+"""Parallel engine vs engine matches with Elo estimation and SPRT."""
+import json
+import math
+import os
+import random
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, IO, List, Tuple, Union
+from .damitalia import Game, logger
+from .engine import Engine
+from .params import MAX_PLIES
+
+
+def parse_engine_config(config: str) -> Dict[str, int]:
+    """ Parse an engine config given as 'key=value,...' (e.g. 'depth=3') into
+    keyword arguments for `Engine` """
+    kwargs = {}
+    for item in filter(None, config.split(',')):
+        key, _, value = item.partition('=')
+        if key not in ['depth', 'seed']:
+            raise ValueError(f'unknown engine parameter {key}')
+        kwargs[key] = int(value)
+    return kwargs
+
+
+def get_opening(opening_index: int, opening_plies: int, seed: int = 0) -> Game:
+    """ Opening position reached by `opening_plies` random plies, the same for
+    a given `opening_index` and `seed` """
+    rng = random.Random(seed * 1000003 + opening_index)
+    game = Game()
+    for _ in range(opening_plies):
+        if game.is_over():
+            break
+        game.play(rng.choice(game.legal_moves()))
+    return game
+
+
+def play_game(game: Game, white: Engine, black: Engine) -> Tuple[str, int]:
+    """ Play `game` to its end. Return the result ('white', 'black' or 'draw',
+    also when the ply limit is reached) and the number of plies played """
+    plies = 0
+    while plies < MAX_PLIES:
+        result = game.result()
+        if result is not None:
+            return result, plies
+        engine = white if game.get_color() == 'white' else black
+        game.play(engine.choose(game))
+        plies += 1
+    return 'draw', plies
+
+
+def play_pair(opening_index: int, engine1: Dict[str, int], engine2: Dict[str, int],
+        opening_plies: int, seed: int = 0) -> List[Dict]:
+    """ Play the same opening twice, each engine having white once. Scores
+    are given from the point of view of `engine1` """
+    records = []
+    for engine1_color in ['white', 'black']:
+        game = get_opening(opening_index, opening_plies, seed)
+        first = Engine(**{'seed': seed + opening_index, **engine1})
+        second = Engine(**{'seed': seed + opening_index, **engine2})
+        white, black = (first, second) if engine1_color == 'white' else (second, first)
+        result, plies = play_game(game, white=white, black=black)
+        score = 0.5 if result == 'draw' else float(result == engine1_color)
+        records.append({'opening': opening_index, 'engine1_color': engine1_color,
+            'result': result, 'score': score, 'plies': plies})
+    return records
+
+
+def elo_from_score(score: float) -> float:
+    """ Elo difference giving the expected `score`, infinite for 0 and 1 """
+    if score <= 0. or score >= 1.:
+        return math.copysign(float('inf'), score - 0.5)
+    return -400. * math.log10(1. / score - 1.)
+
+
+def score_from_elo(elo: float) -> float:
+    return 1. / (1. + 10 ** (-elo / 400.))
+
+
+# Score of a pair of games divided by 2: 0, 0.5, 1, 1.5 or 2 points
+PAIR_SCORES = [0., 0.25, 0.5, 0.75, 1.]
+
+
+def pentanomial_mle(counts: List[int], score: float) -> List[float]:
+    """ Distribution of the pair scores maximizing the likelihood of `counts`
+    under the constraint that the expected score is `score` (0 < score < 1).
+    By the KKT conditions p_i = n_i / (n (1 + l (a_i - score))), `l` being
+    either the root of the constraint or, when the observed pair scores
+    cannot average to `score`, the bound putting the missing mass on the
+    empty extreme pair score """
+    n = sum(counts)
+    offsets = [pair_score - score for pair_score in PAIR_SCORES]
+
+    def constraint(lagrange: float) -> float:
+        return sum(count * offset / (1 + lagrange * offset)
+                for count, offset in zip(counts, offsets) if count > 0)
+
+    lower, upper = -1. / offsets[-1], -1. / offsets[0]
+    if counts[0] == 0 and constraint(upper) >= 0:
+        lagrange, extra = upper, 0
+    elif counts[-1] == 0 and constraint(lower) <= 0:
+        lagrange, extra = lower, len(PAIR_SCORES) - 1
+    else:
+        extra = None
+        for _ in range(200):
+            middle = (lower + upper) / 2
+            if constraint(middle) > 0:
+                lower = middle
+            else:
+                upper = middle
+        lagrange = (lower + upper) / 2
+    distribution = [count / (n * (1 + lagrange * offset)) if count > 0 else 0.
+            for count, offset in zip(counts, offsets)]
+    if extra is not None:
+        distribution[extra] = max(0., 1. - sum(distribution))
+    return distribution
+
+
+class MatchStats:
+    def __init__(self):
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        self.pairs = [0] * len(PAIR_SCORES)
+
+    def add(self, score: float) -> None:
+        if score == 1.:
+            self.wins += 1
+        elif score == 0.:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+    def add_pair(self, scores: List[float]) -> None:
+        """ Add the scores of the two games played on the same opening """
+        for score in scores:
+            self.add(score)
+        self.pairs[int(round(2 * sum(scores)))] += 1
+
+    def get_games(self) -> int:
+        return self.wins + self.draws + self.losses
+
+    def get_score(self) -> float:
+        games = self.get_games()
+        return (self.wins + 0.5 * self.draws) / games if games else 0.5
+
+    def get_elo(self) -> Tuple[float, float]:
+        """ Elo difference of engine1 over engine2 and its 95% error margin,
+        from the variance of the pair scores. The margin is infinite when the
+        score or its confidence interval reaches 0 or 1 """
+        n_pairs = sum(self.pairs)
+        score = self.get_score()
+        elo = elo_from_score(score)
+        if n_pairs < 2:
+            return elo, float('inf')
+        mean = sum(count * pair_score for count, pair_score in
+                zip(self.pairs, PAIR_SCORES)) / n_pairs
+        variance = sum(count * (pair_score - mean) ** 2 for count, pair_score in
+                zip(self.pairs, PAIR_SCORES)) / (n_pairs - 1)
+        margin = 1.96 * math.sqrt(variance / n_pairs)
+        if score - margin <= 0. or score + margin >= 1.:
+            return elo, float('inf')
+        return elo, (elo_from_score(score + margin) - elo_from_score(score - margin)) / 2
+
+    def get_llr(self, elo0: float, elo1: float) -> float:
+        """ Log-likelihood ratio of H1 (elo = elo1) against H0 (elo = elo0),
+        generalized SPRT on the pentanomial distribution of the pair scores,
+        so that the two games of an opening are not taken as independent """
+        if sum(self.pairs) == 0:
+            return 0.
+        distribution0 = pentanomial_mle(self.pairs, score_from_elo(elo0))
+        distribution1 = pentanomial_mle(self.pairs, score_from_elo(elo1))
+        return sum(count * math.log(p1 / p0) for count, p0, p1 in
+                zip(self.pairs, distribution0, distribution1) if count > 0)
+
+
+def sprt_bounds(alpha: float, beta: float) -> Tuple[float, float]:
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def run_match(engine1: Dict[str, int], engine2: Dict[str, int], pairs: int,
+        output: Union[IO, None] = None, workers: Union[int, None] = None,
+        opening_plies: int = 4, seed: int = 0, sprt: Union[Tuple[float, float], None] = None,
+        alpha: float = 0.05, beta: float = 0.05) -> Tuple[MatchStats, str]:
+    """ Play up to `pairs` paired openings between `engine1` and `engine2` over
+    a process pool, writing each game record as a json line to `output`. With
+    `sprt` = (elo0, elo1) the match stops as soon as the SPRT, checked after
+    each finished pair, accepts H0 or H1.
+    Return the stats and the SPRT decision ('H0', 'H1' or 'inconclusive') """
+    stats = MatchStats()
+    decision = 'inconclusive'
+    lower, upper = sprt_bounds(alpha, beta)
+    workers = os.cpu_count() if workers is None else workers
+    max_pending = 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        opening_indices = iter(range(pairs))
+        pending = set()
+        while True:
+            for opening_index in opening_indices:
+                pending.add(executor.submit(play_pair, opening_index, engine1,
+                    engine2, opening_plies, seed))
+                if len(pending) >= max_pending:
+                    break
+            if len(pending) == 0:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                records = future.result()
+                stats.add_pair([record['score'] for record in records])
+                if output is not None:
+                    for record in records:
+                        output.write(json.dumps(record) + '\n')
+                if sprt is not None and decision == 'inconclusive':
+                    llr = stats.get_llr(*sprt)
+                    if llr <= lower or llr >= upper:
+                        decision = 'H0' if llr <= lower else 'H1'
+                        logger.info('SPRT %s accepted after %i games', decision,
+                                stats.get_games())
+            if output is not None:
+                output.flush()
+            if decision != 'inconclusive':
+                for future in pending:
+                    future.cancel()
+                break
+    return stats, decision
+
+
+def format_report(stats: MatchStats, decision: str, sprt: Union[Tuple[float,
+        float], None] = None, alpha: float = 0.05, beta: float = 0.05) -> str:
+    elo, margin = stats.get_elo()
+    lines = [f'Games: {stats.get_games()}  W: {stats.wins}  D: {stats.draws}  L: {stats.losses}',
+            f'Score: {stats.get_score():.4f}  Elo: {elo:+.1f} +/- {margin:.1f}']
+    if sprt is not None:
+        lower, upper = sprt_bounds(alpha, beta)
+        lines.append(f'SPRT elo0={sprt[0]} elo1={sprt[1]}: '
+                f'LLR {stats.get_llr(*sprt):.3f} [{lower:.3f}, {upper:.3f}] {decision}')
+    return '\n'.join(lines)
@@ -0,0 +1,13 @@
+"""Fixtures shared by the test modules."""
+
+import pytest
+from damitalia import damitalia
+
+
+@pytest.fixture
+def dual_board_setting():
+    board_setting = {i: None for i \
+            in range(damitalia.get_max_square_index() + 1)}
+    board_setting[5] = damitalia.Stone(1, 'pawn', 'white')
+    board_setting[10] = damitalia.Stone(0, 'pawn', 'black')
+    return board_setting
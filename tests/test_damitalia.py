@@ -2,6 +2,11 @@
 
 """Tests for `damitalia` package."""
 
+import os
+import random
+import subprocess
+import sys
+import numpy as np
 import pytest
 from damitalia import damitalia, params
 
@@ -32,14 +37,6 @@ def v_board_setting():
     board_setting[17] = damitalia.Stone(2, 'queen', 'black')
     return board_setting
 
-@pytest.fixture
-def dual_board_setting():
-    board_setting = {i: None for i \
-            in range(damitalia.get_max_square_index() + 1)}
-    board_setting[5] = damitalia.Stone(1, 'pawn', 'white')
-    board_setting[10] = damitalia.Stone(0, 'pawn', 'black')
-    return board_setting
-
 
 @pytest.fixture
 def forelast_board_setting():
@@ -199,3 +196,126 @@ def test_filter_capture_sequences(capture_board_setting):
     assert len(filtered) == 1
     assert filtered[0] == capture_sequence_1
 
+
+def test_game_legal_moves():
+    game = damitalia.Game()
+    legal_moves = game.legal_moves()
+    if params.BOARD_BREADTH == 8:
+        assert len(legal_moves) == 7
+    assert all(len(sequence) == 1 for sequence in legal_moves)
+    game.play(legal_moves[0])
+    assert game.get_color() == 'black'
+    assert game.winner() is None
+
+
+def test_game_play_capture(dual_board_setting):
+    game = damitalia.Game(initial_setting=dual_board_setting)
+    legal_moves = game.legal_moves()
+    assert len(legal_moves) == 1
+    assert damitalia.sequence2str(legal_moves[0], True) == '5x14'
+    game.play(legal_moves[0])
+    assert game.get_setting().get(10) is None
+    assert game.get_setting().get(14).get_color() == 'white'
+    assert game.winner() == 'white'
+
+
+def test_stone_code():
+    stone = damitalia.Stone(0, 'pawn', 'black')
+    assert stone.get_code() == damitalia.BLACK_PAWN
+    stone.set_value('queen')
+    assert stone.get_code() == damitalia.BLACK_QUEEN
+    assert stone.get_color() == 'black' and stone.get_value() == 'queen'
+    stone.set_value('pawn')
+    assert stone.get_value() == 'queen'
+
+
+def test_game_squares(v_board_setting):
+    game = damitalia.Game(initial_setting=v_board_setting)
+    squares = game.get_squares()
+    assert squares.dtype == np.int8
+    assert squares[17] == damitalia.BLACK_QUEEN
+    setting = game.get_setting()
+    assert [i for i, stone in setting.items() if stone is not None] == [1, 4, 5, 12, 16, 17]
+    assert setting[12].get_color() == 'white'
+    copy = game.copy()
+    copy.play(copy.legal_moves()[0])
+    assert np.array_equal(game.get_squares(), damitalia.board_setting2squares(v_board_setting))
+
+
+@pytest.fixture
+def queens_game():
+    board_setting = {i: None for i in range(damitalia.get_max_square_index() + 1)}
+    board_setting[0] = damitalia.Stone(0, 'queen', 'white')
+    board_setting[31] = damitalia.Stone(1, 'queen', 'black')
+    board_setting[8] = damitalia.Stone(2, 'pawn', 'white')
+    return damitalia.Game(initial_setting=board_setting)
+
+
+def play_notation(game, notation):
+    for sequence in game.legal_moves():
+        if damitalia.sequence2str(sequence, game.is_capture(sequence)) == notation:
+            game.play(sequence)
+            return
+    raise ValueError(f'{notation} is not legal')
+
+
+def test_game_undo(queens_game):
+    squares = queens_game.get_squares().copy()
+    play_notation(queens_game, '0-4')
+    play_notation(queens_game, '31-27')
+    assert len(queens_game.get_history()) == 2
+    queens_game.undo()
+    queens_game.undo()
+    assert np.array_equal(queens_game.get_squares(), squares)
+    assert queens_game.get_color() == 'white'
+    assert queens_game.hash_counts == {queens_game.position_hash(): 1}
+    assert queens_game.no_progress == 0
+
+
+def test_game_repetition(queens_game):
+    for _ in range(2):
+        assert queens_game.result() is None
+        for notation in ['0-4', '31-27', '4-0', '27-31']:
+            play_notation(queens_game, notation)
+    assert queens_game.is_repetition()
+    assert queens_game.result() == 'draw'
+    assert queens_game.winner() is None
+    queens_game.undo()
+    assert not queens_game.is_draw()
+
+
+def test_game_no_progress(queens_game):
+    play_notation(queens_game, '0-4')
+    play_notation(queens_game, '31-27')
+    assert queens_game.no_progress == 2
+    play_notation(queens_game, '8-12')
+    assert queens_game.no_progress == 0
+    queens_game.no_progress = params.NO_PROGRESS_LIMIT
+    assert queens_game.is_draw()
+
+
+def test_incremental_position_hash():
+    rng = random.Random(0)
+    for _ in range(5):
+        game = damitalia.Game()
+        while not game.is_over():
+            game.play(rng.choice(game.legal_moves()))
+            assert game.hashes[-1] == game.position_hash()
+        while game.get_history():
+            game.undo()
+            assert game.hashes[-1] == game.position_hash()
+
+
+def test_position_hash_across_processes(queens_game):
+    """ Hashes must not depend on the per process salt of `hash()` """
+    code = ('from damitalia import damitalia; '
+            'print(damitalia.Game().position_hash())')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    hashes = {subprocess.run([sys.executable, '-c', code], check=True,
+        capture_output=True, text=True, cwd=root,
+        env={**os.environ, 'PYTHONHASHSEED': seed}).stdout.strip()
+        for seed in ['1', '2']}
+    assert hashes == {str(damitalia.Game().position_hash())}
+    copy = queens_game.copy()
+    assert copy.hashes == queens_game.hashes
+    assert copy.position_hash() == queens_game.position_hash()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+
+"""Tests for `damitalia.differential` module."""
+
+from damitalia import damitalia, differential, notation
+
+
+def no_queen_capture(game):
+    """ Broken generator: queens never capture """
+    moves = differential.fast_legal_moves(game)
+    squares = game.get_squares()
+    return {move for move in moves if 'x' not in move or
+            not damitalia.is_queen(squares[int(move.split('x')[0])])}
+
+
+def test_random_positions():
+    games = list(differential.random_positions(300, seed=0))
+    assert len(games) == 300
+    assert notation.game2fen(games[0]) == notation.game2fen(damitalia.Game())
+    assert len({notation.game2key(game) for game in games}) > 100
+
+
+def test_random_positions_stop_at_game_end():
+    games = list(differential.random_positions(2000, seed=0))
+    ends = [i for i, game in enumerate(games[:-1]) if game.is_over()]
+    assert len(ends) > 0
+    assert all(len(games[i + 1].get_history()) == 0 for i in ends)
+
+
+def test_generators_agree():
+    assert differential.compare(500, seed=0) == []
+
+
+def test_shrink_mismatch():
+    mismatches = differential.compare(3000, seed=0, generators={
+        'reference': differential.reference_legal_moves,
+        'broken': no_queen_capture})
+    assert len(mismatches) > 0
+    fixture = notation.fen2game(mismatches[0]['fixture'])
+    assert (damitalia.get_max_square_index() + 1 -
+            list(fixture.get_squares()).count(damitalia.EMPTY)) == 2
+    assert mismatches[0]['reference'] != mismatches[0]['broken']
+
+
+def test_benchmark():
+    timings = differential.benchmark(50)
+    assert set(timings.keys()) == {'reference', 'fast'}
+    assert all(speed > 0 for _, speed in timings.values())
@@ -0,0 +1,17 @@
+#!/usr/bin/env python
+
+"""Tests for `damitalia.engine` module."""
+
+from damitalia import damitalia, engine
+
+
+def test_evaluate():
+    game = damitalia.Game()
+    assert engine.evaluate(game) == 0.
+
+
+def test_search_takes_free_stone(dual_board_setting):
+    game = damitalia.Game(initial_setting=dual_board_setting, color='black')
+    score, sequence = engine.search(game, depth=2)
+    assert damitalia.sequence2str(sequence, True) == '10x1'
+    assert score > 0
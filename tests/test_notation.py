@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+
+"""Tests for `damitalia.notation` module."""
+
+import random
+import numpy as np
+import pytest
+from damitalia import damitalia, notation
+
+
+@pytest.fixture
+def games():
+    rng = random.Random(0)
+    games = []
+    for _ in range(5):
+        game = damitalia.Game()
+        for _ in range(rng.randrange(30)):
+            legal_moves = game.legal_moves()
+            if len(legal_moves) == 0:
+                break
+            game.play(rng.choice(legal_moves))
+        games.append(game)
+    return games
+
+
+@pytest.fixture
+def queen_game():
+    board_setting = {i: None for i in range(damitalia.get_max_square_index() + 1)}
+    board_setting[0] = damitalia.Stone(0, 'pawn', 'white')
+    board_setting[9] = damitalia.Stone(1, 'queen', 'white')
+    board_setting[20] = damitalia.Stone(2, 'pawn', 'black')
+    board_setting[31] = damitalia.Stone(3, 'queen', 'black')
+    return damitalia.Game(initial_setting=board_setting, color='black')
+
+
+def test_fen(queen_game):
+    fen = notation.game2fen(queen_game)
+    assert fen == 'B:W0,K9:B20,K31'
+    assert notation.game2fen(notation.fen2game(fen)) == fen
+    assert notation.game2fen(damitalia.Game()).startswith('W:W0,1,2,3,4,')
+    for invalid in ['W:B1:W2', 'W:W1,1:B', 'W:W99:B', 'W:W1']:
+        with pytest.raises(ValueError):
+            notation.fen2game(invalid)
+
+
+def test_key_round_trip(queen_game, games):
+    for game in games + [queen_game]:
+        key = notation.game2key(game)
+        assert key < 2 ** 128
+        assert notation.game2fen(notation.key2game(key)) == notation.game2fen(game)
+    keys = {notation.game2key(game) for game in [damitalia.Game(), damitalia.Game()]}
+    assert len(keys) == 1
+    assert notation.game2key(queen_game) != notation.game2key(
+            notation.fen2game('W:W0,K9:B20,K31'))
+
+
+def test_bulk_round_trip(games):
+    keys = notation.games2keys(games)
+    assert keys.shape == (len(games), 2) and keys.dtype == np.uint64
+    decoded = notation.keys2games(keys)
+    assert [notation.game2fen(game) for game in decoded] == \
+            [notation.game2fen(game) for game in games]
+    squares, colors = notation.decode_positions(keys)
+    assert np.array_equal(notation.encode_positions(squares, colors), keys)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+
+"""Tests for `damitalia.parallel` module and the transposition table."""
+
+import pytest
+from damitalia import damitalia, engine, parallel, tournament
+
+
+def test_transposition_table():
+    tt = engine.TranspositionTable(2 ** 4)
+    key = damitalia.Game().position_hash()
+    assert tt.probe(key) is None
+    tt.store(key, 3, engine.LOWER_BOUND, -1002.5, 6)
+    assert tt.probe(key) == (3, engine.LOWER_BOUND, -1002.5, 6)
+    assert tt.probe(key + 2 ** 4) is None
+    tt.table[key % 2 ** 4, 1] ^= 1
+    assert tt.probe(key) is None
+    with pytest.raises(ValueError):
+        engine.TranspositionTable(10)
+
+
+def test_search_with_table():
+    for opening_index in range(3):
+        game = tournament.get_opening(opening_index, 10)
+        score, _ = engine.search(game, 4)
+        tt = engine.TranspositionTable(2 ** 12)
+        stats = engine.SearchStats()
+        assert engine.search(game, 4, tt=tt, stats=stats)[0] == score
+        assert stats.nodes > 0
+
+
+def test_lazy_smp():
+    game = tournament.get_opening(0, 10)
+    result = parallel.lazy_smp(game, 3, workers=2, tt_size=2 ** 12)
+    assert result['depth'] == 4
+    assert result['sequence'] in game.legal_moves()
+    assert result['nodes'] > 0 and result['nodes_per_second'] > 0
+    assert 0 < result['time_to_depth'] <= result['elapsed']
+    result = parallel.lazy_smp(game, 3, workers=1, tt_size=2 ** 12)
+    assert result['score'] == engine.search(game, 3)[0]
+
+
+def test_merge_results():
+    results = [{'score': 1., 'move_index': 2, 'depth': 4},
+            {'score': 0., 'move_index': 1, 'depth': 4},
+            {'score': 0., 'move_index': 1, 'depth': 4},
+            {'score': 3., 'move_index': 0, 'depth': 3}]
+    assert parallel.merge_results(results) == {'score': 0., 'move_index': 1, 'depth': 4}
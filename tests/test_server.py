@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+"""Tests for `damitalia.server` module."""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pytest
+from damitalia import engine, notation, server
+
+
+@pytest.fixture
+def game_server():
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield server.GameServer(engine=engine.Engine(depth=1, seed=0),
+            executor=executor, seed=0)
+    executor.shutdown()
+
+
+def test_human_session(game_server):
+    async def session():
+        answer = await game_server.handle_command('NEW white')
+        assert answer == 'OK 0'
+        answer = await game_server.handle_command('MOVES 0')
+        moves = answer.split()[1:]
+        assert '9-13' in moves
+        answer = await game_server.handle_command('PLAY 0 9-14')
+        assert answer.startswith('ERR')
+        answer = await game_server.handle_command('PLAY 0 9-13')
+        assert answer.startswith('OK ')
+        answer = await game_server.handle_command('STATS 0')
+        assert 'plies=2' in answer
+    asyncio.run(session())
+
+
+def test_engine_sessions(game_server):
+    async def sessions():
+        answers = await asyncio.gather(*[game_server.handle_command('NEW none')
+            for _ in range(3)])
+        assert sorted(answers) == ['OK 0', 'OK 1', 'OK 2']
+        results = await asyncio.gather(*[game_server.handle_command(f'WAIT {i}')
+            for i in range(3)])
+        for result in results:
+            assert result.split()[1] in ['white', 'black', 'draw']
+    asyncio.run(sessions())
+
+
+def test_engine_sessions_process_pool():
+    """ Sessions played in a process pool must not all replay the same game """
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        game_server = server.GameServer(engine=engine.Engine(depth=1),
+                executor=executor)
+
+        async def sessions():
+            for _ in range(3):
+                await game_server.handle_command('NEW none')
+            await asyncio.gather(*[game_server.handle_command(f'WAIT {i}')
+                for i in range(3)])
+        asyncio.run(sessions())
+        games = [game_server.sessions[i].game for i in range(3)]
+        assert len({notation.game2key(game) for game in games}) > 1
+
+
+def test_wait_closed_session(game_server):
+    async def wait_close():
+        await game_server.handle_command('NEW none')
+        return await asyncio.gather(game_server.handle_command('WAIT 0'),
+                game_server.handle_command('CLOSE 0'))
+    assert asyncio.run(wait_close()) == ['END closed', 'OK']
+
+
+def test_unknown_command(game_server):
+    assert asyncio.run(game_server.handle_command('FOO')).startswith('ERR')
+    assert asyncio.run(game_server.handle_command('MOVES 7')).startswith('ERR')
+    assert (asyncio.run(game_server.handle_command('PLAY 0')) ==
+            'ERR wrong number of arguments for PLAY')
+    assert (asyncio.run(game_server.handle_command('NEW white black')) ==
+            'ERR wrong number of arguments for NEW')
+
+
+def test_executor_failure(game_server):
+    def broken_choose(game, seed=None):
+        raise RuntimeError('engine crashed')
+    game_server.engine.choose = broken_choose
+    answer = asyncio.run(game_server.handle_command('NEW black'))
+    assert answer == 'ERR internal error: RuntimeError'
+
+
+def test_transient_executor_failure(game_server):
+    """ A failed engine reply must leave the session playable """
+    choose = game_server.engine.choose
+    fail_next = [True]
+
+    def choose_failing_once(game, seed=None):
+        if fail_next[0]:
+            fail_next[0] = False
+            raise RuntimeError('engine crashed')
+        return choose(game, seed)
+    game_server.engine.choose = choose_failing_once
+
+    async def session():
+        assert (await game_server.handle_command('NEW black') ==
+                'ERR internal error: RuntimeError')
+        assert game_server.sessions == {}
+        fail_next[0] = True
+        assert (await game_server.handle_command('NEW white')) == 'OK 1'
+        answer = await game_server.handle_command('PLAY 1 9-13')
+        assert answer == 'ERR internal error: RuntimeError'
+        assert game_server.sessions[1].game.get_history() == []
+        assert game_server.get_metrics()['plies'] == 0
+        answer = await game_server.handle_command('PLAY 1 9-13')
+        assert answer.startswith('OK ')
+        answer = await game_server.handle_command('STATS 1')
+        assert 'plies=2' in answer
+    asyncio.run(session())
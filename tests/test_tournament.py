@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+"""Tests for `damitalia.tournament` module."""
+
+import io
+import json
+import math
+import pytest
+from damitalia import tournament
+
+
+def test_parse_engine_config():
+    assert tournament.parse_engine_config('depth=3,seed=1') == {'depth': 3, 'seed': 1}
+    with pytest.raises(ValueError):
+        tournament.parse_engine_config('speed=3')
+
+
+def test_elo_score():
+    assert tournament.elo_from_score(0.5) == 0.
+    assert tournament.score_from_elo(0.) == 0.5
+    assert tournament.elo_from_score(tournament.score_from_elo(100.)) == pytest.approx(100.)
+    assert tournament.elo_from_score(1.) == math.inf
+    assert tournament.elo_from_score(0.) == -math.inf
+
+
+def test_match_stats():
+    stats = tournament.MatchStats()
+    for scores in [[1., 1.], [1., 0.5], [0., 0.5], [1., 0.]]:
+        stats.add_pair(scores)
+    assert (stats.wins, stats.draws, stats.losses) == (4, 2, 2)
+    assert stats.pairs == [0, 1, 1, 1, 1]
+    assert stats.get_score() == 0.625
+    elo, margin = stats.get_elo()
+    assert elo > 0 and 0 < margin < math.inf
+    assert stats.get_llr(0., 50.) > 0
+    assert stats.get_llr(200., 250.) < 0
+
+
+def test_pentanomial_mle():
+    for counts in [[1, 2, 5, 2, 1], [0, 0, 3, 0, 0], [0, 0, 0, 0, 3]]:
+        for score in [0.3, 0.5, 0.7]:
+            distribution = tournament.pentanomial_mle(counts, score)
+            assert sum(distribution) == pytest.approx(1.)
+            assert sum(p * a for p, a in zip(distribution,
+                tournament.PAIR_SCORES)) == pytest.approx(score)
+
+
+def test_sprt_one_sided_record():
+    stats = tournament.MatchStats()
+    lower, upper = tournament.sprt_bounds(0.05, 0.05)
+    for _ in range(3):
+        stats.add_pair([1., 1.])
+    assert stats.get_elo() == (math.inf, math.inf)
+    # the pairs being the observations, 6-0 weighs as 3 independent wins
+    llr = 3 * math.log(tournament.score_from_elo(50.) / 0.5)
+    assert stats.get_llr(0., 50.) == pytest.approx(llr)
+    assert lower < stats.get_llr(0., 50.) < upper
+    for _ in range(30):
+        stats.add_pair([1., 1.])
+    assert stats.get_llr(0., 50.) > upper
+
+
+def test_run_match():
+    output = io.StringIO()
+    stats, decision = tournament.run_match(engine1={'depth': 1},
+            engine2={'depth': 1}, pairs=1, output=output, workers=1)
+    assert stats.get_games() == 2
+    assert decision == 'inconclusive'
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [record['engine1_color'] for record in records] == ['white', 'black']